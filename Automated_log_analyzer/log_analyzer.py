@@ -13,28 +13,66 @@ Automated Log Analyzer & Alerting
 Dependencies:
   pip install paramiko schedule
 
+Optional (faster regex engines; the analyzer falls back to `re`):
+  pip install google-re2     # linear-time per-line matching
+  pip install hyperscan      # multi-pattern scan of whole file buffers
+  pip install pyahocorasick  # one-pass literal prefilter when only `re` is available
+  pip install watchdog       # only re-read local files the OS reports changed
+
 Run:
   python log_analyzer.py
 """
 
 import csv
+import fnmatch
+import http.client
 import json
+import multiprocessing
 import os
 import re
+import signal
 import smtplib
 import socket
 import sqlite3
 import ssl
 import sys
+import threading
 import time
+import urllib.parse
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
 from email.message import EmailMessage
+from functools import partial
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import AbstractSet, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
 
 import paramiko  # type: ignore
 import schedule  # type: ignore
 
+try:
+    import re2  # type: ignore
+except ImportError:  # optional dependency
+    re2 = None
+
+try:
+    import hyperscan  # type: ignore
+except ImportError:  # optional dependency
+    hyperscan = None
+
+try:
+    import ahocorasick  # type: ignore
+except ImportError:  # optional dependency
+    ahocorasick = None
+
+try:
+    from watchdog.events import FileSystemEventHandler  # type: ignore
+    from watchdog.observers import Observer  # type: ignore
+except ImportError:  # optional dependency
+    FileSystemEventHandler = object
+    Observer = None
+
 
 # ============
 # CONFIG BLOCK
@@ -73,6 +111,21 @@ CONFIG = {
     # Scan interval (seconds) for schedule
     "SCAN_EVERY_SECONDS": 10,
 
+    # With watchdog installed, get change notifications for local files
+    # (inotify on Linux) and only stat/read files that changed; every
+    # WATCH_FULL_RESCAN_SECONDS all local files are checked anyway. Files
+    # no watch covers (e.g. their directory doesn't exist yet) are still
+    # checked every cycle, and watches are added once the directory appears.
+    "WATCH_LOCAL_FILES": True,
+    "WATCH_FULL_RESCAN_SECONDS": 300,
+
+    # Worker processes for scanning local files in parallel (0 = one per CPU)
+    "LOCAL_SCAN_WORKERS": 0,
+
+    # Threads for reading remote files concurrently (one SFTP channel each;
+    # 0 = ThreadPoolExecutor's default, CPUs + 4 up to 32)
+    "REMOTE_SCAN_WORKERS": 4,
+
     # Where to store outputs
     "DATA_DIR": "./data",
     "SQLITE_PATH": "./data/events.db",
@@ -126,6 +179,26 @@ CONFIG = {
             r"\b403\b|\b401\b|\b404\b .* from (?P<ip>\d+\.\d+\.\d+\.\d+)",                  # repeated errors (approx)
         ],
     },
+
+    # Cheap literal prefilter, used when only Python's re is available.
+    # Keyed by a pattern exactly as written in PATTERNS; every line that
+    # pattern matches must contain one of its literals (case-insensitive).
+    # Patterns without an entry (e.g. newly added or edited ones) are still
+    # matched, just without the prefilter's help.
+    "PREFILTERS": {
+        r"Failed password for (invalid user )?\w+ from (?P<ip>\d+\.\d+\.\d+\.\d+)": ["failed password"],
+        r"Invalid user \w+ from (?P<ip>\d+\.\d+\.\d+\.\d+)": ["invalid user"],
+        r"authentication failure;.*rhost=(?P<ip>\d+\.\d+\.\d+\.\d+)": ["authentication failure"],
+        r"\bsegfault\b|\bsegmentation fault\b": ["segfault", "segmentation fault"],
+        r"\bkernel panic\b": ["kernel panic"],
+        r"Traceback \(most recent call last\):": ["traceback"],
+        r"\bCRITICAL\b.*\berror\b": ["critical"],
+        r"service .* (crashed|exited with code \d+)": ["service "],
+        r"DROP .* IN=(?P<iface>\w+) .* SRC=(?P<ip>\d+\.\d+\.\d+\.\d+)": ["drop "],
+        r"(\b('|\")?\s*or\s+1=1\b)|(\bunion\b.*\bselect\b)": ["1=1", "union"],
+        r"(\.\./){2,}": ["../"],
+        r"\b403\b|\b401\b|\b404\b .* from (?P<ip>\d+\.\d+\.\d+\.\d+)": ["403", "401", "404"],
+    },
 }
 
 
@@ -135,12 +208,312 @@ CONFIG = {
 
 Path(CONFIG["DATA_DIR"]).mkdir(parents=True, exist_ok=True)
 
+
+def compile_pattern(pattern: str) -> re.Pattern:
+    """
+    Case-insensitive compile to a *bytes* regex, so log data never has to be
+    decoded just to be matched. Prefers RE2 (DFA, linear time, no catastrophic
+    backtracking); falls back to Python's re if RE2 is missing or rejects it.
+    """
+    raw = pattern.encode("utf-8")
+    if re2 is not None:
+        try:
+            return re2.compile(b"(?i)" + raw)
+        except re2.error:
+            pass
+    return re.compile(raw, re.IGNORECASE)
+
+
 # Compile regexes once
 COMPILED_PATTERNS: Dict[str, List[re.Pattern]] = {
-    cat: [re.compile(p, re.IGNORECASE) for p in pats]
+    cat: [compile_pattern(p) for p in pats]
     for cat, pats in CONFIG["PATTERNS"].items()
 }
 
+# Flattened (category, pattern) list in priority order: category order first,
+# then pattern order within the category (same order the old nested loop used).
+PATTERN_ORDER: List[Tuple[str, str, re.Pattern]] = [
+    (cat, src, pat)
+    for cat, pats in CONFIG["PATTERNS"].items()
+    for src, pat in zip(pats, COMPILED_PATTERNS[cat])
+]
+
+
+def _strip_named_groups(pattern: str) -> str:
+    # Several patterns reuse names like "ip"; a single alternation can't hold
+    # duplicate group names, and we only need the outer group per pattern.
+    return re.sub(r"\(\?P<\w+>", "(?:", pattern)
+
+
+# One master regex: every pattern wrapped in a named group "g<CATEGORY>_<i>",
+# so a single search per line tells us whether (and which pattern) matched.
+_alternatives = [
+    f"(?P<g{cat}_{rank}>{_strip_named_groups(src)})"
+    for rank, (cat, src, _) in enumerate(PATTERN_ORDER)
+]
+MASTER_PATTERN: re.Pattern = compile_pattern("|".join(_alternatives))
+
+# Group number -> PATTERN_ORDER rank. Keyed by number (Match.lastindex)
+# because RE2 reports bytes group names for bytes patterns and re reports str.
+PATTERN_GROUPS: Dict[int, int] = {
+    index: int((name.decode() if isinstance(name, bytes) else name).rsplit("_", 1)[1])
+    for name, index in MASTER_PATTERN.groupindex.items()
+}
+
+
+def build_prefilter() -> Tuple[Dict[bytes, FrozenSet[int]], FrozenSet[int]]:
+    """
+    Maps each lowercased prefilter literal to the PATTERN_ORDER ranks of the
+    patterns that list it: a line containing the literal only has to be
+    tried against those patterns. Also returns the ranks of patterns with
+    no literals, which get their own regex walk over the buffer instead.
+    """
+    # A key that no longer matches a pattern (e.g. the pattern was edited)
+    # is dead: say so rather than silently losing its literals
+    known = {src for _, src, _ in PATTERN_ORDER}
+    for src in CONFIG["PREFILTERS"]:
+        if src not in known:
+            print(f"[WARN] PREFILTERS entry matches no pattern in PATTERNS, ignored: {src}")
+
+    literals: Dict[bytes, Set[int]] = {}
+    uncovered = set()
+    for rank, (_, src, _) in enumerate(PATTERN_ORDER):
+        lits = CONFIG["PREFILTERS"].get(src)
+        if not lits:
+            uncovered.add(rank)
+            continue
+        for lit in lits:
+            literals.setdefault(lit.lower().encode("utf-8"), set()).add(rank)
+    return {lit: frozenset(ranks) for lit, ranks in literals.items()}, frozenset(uncovered)
+
+
+PREFILTER_LITERALS, PREFILTER_UNCOVERED = build_prefilter()
+
+# The patterns without literals as one alternation (None if there are none)
+UNCOVERED_PATTERN: Optional[re.Pattern] = (
+    compile_pattern("|".join(f"(?:{_strip_named_groups(PATTERN_ORDER[rank][1])})" for rank in sorted(PREFILTER_UNCOVERED)))
+    if PREFILTER_UNCOVERED
+    else None
+)
+
+
+def build_prefilter_automaton():
+    """
+    The prefilter literals as one Aho-Corasick automaton, valued with their
+    ranks. Keys are str: buffers are searched as latin-1, so character
+    offsets equal byte offsets. Returns None if pyahocorasick is unavailable.
+    """
+    if ahocorasick is None or not PREFILTER_LITERALS:
+        return None
+    automaton = ahocorasick.Automaton()
+    for lit, ranks in PREFILTER_LITERALS.items():
+        automaton.add_word(lit.decode("latin-1"), ranks)
+    automaton.make_automaton()
+    return automaton
+
+
+PREFILTER_AUTOMATON = build_prefilter_automaton()
+
+
+def match_line(line: bytes) -> Optional[Tuple[str, str]]:
+    """
+    Returns (category, pattern) for the first pattern that matches the line,
+    or None. One master-regex search covers the (common) no-match case.
+    """
+    m = MASTER_PATTERN.search(line)
+    if m is None:
+        return None
+    rank = PATTERN_GROUPS[m.lastindex]
+    # The alternation reports the leftmost hit, which may not be the
+    # highest-priority pattern; re-check only the patterns ranked above it.
+    for cat, src, pat in PATTERN_ORDER[:rank]:
+        if pat.search(line):
+            return cat, src
+    cat, src, _ = PATTERN_ORDER[rank]
+    return cat, src
+
+
+def build_hyperscan_db():
+    """
+    Compile every pattern into one Hyperscan block-mode database (ids are
+    PATTERN_ORDER ranks). Returns None if Hyperscan is unavailable.
+    """
+    if hyperscan is None:
+        return None
+    database = hyperscan.Database()
+    try:
+        database.compile(
+            expressions=[_strip_named_groups(src).encode("utf-8") for _, src, _ in PATTERN_ORDER],
+            ids=list(range(len(PATTERN_ORDER))),
+            elements=len(PATTERN_ORDER),
+            flags=hyperscan.HS_FLAG_CASELESS,
+        )
+    except hyperscan.error as e:
+        print(f"[WARN] Hyperscan compile failed, using regex scanner: {e}")
+        return None
+    return database
+
+
+HS_DATABASE = build_hyperscan_db()
+
+# The database is shared, but Hyperscan scratch space must not be used by two
+# scans at once (remote files are scanned on threads): one per thread.
+_HS_LOCAL = threading.local()
+
+
+def _hyperscan_candidates(buf: bytes) -> Dict[int, Optional[AbstractSet[int]]]:
+    # One native pass over the whole buffer, collecting which pattern ids
+    # matched on each line. Any match within a line ends on that line, so
+    # its id is in the set: confirming just those patterns in rank order
+    # gives the same answer as match_line() without the master regex.
+    line_ranks: Dict[int, Optional[AbstractSet[int]]] = {}
+    rfind = buf.rfind
+    get = line_ranks.get
+
+    def on_match(pat_id, start, end, flags, context):
+        line_start = rfind(b"\n", 0, end) + 1
+        ranks = get(line_start)
+        if ranks is None:
+            line_ranks[line_start] = {pat_id}
+        else:
+            ranks.add(pat_id)
+
+    scratch = getattr(_HS_LOCAL, "scratch", None)
+    if scratch is None:
+        scratch = _HS_LOCAL.scratch = hyperscan.Scratch(HS_DATABASE)
+    HS_DATABASE.scan(buf, match_event_handler=on_match, scratch=scratch)
+    return line_ranks
+
+
+def _prefilter_candidates(buf: bytes) -> Dict[int, Optional[AbstractSet[int]]]:
+    # Find the prefilter literals with C-level find() over the lowercased
+    # buffer; only lines containing one of them reach the regexes, and only
+    # the patterns of the categories whose literals they contain.
+    lowered = buf.lower()
+    find = lowered.find
+    rfind = lowered.rfind
+    line_ranks: Dict[int, Optional[AbstractSet[int]]] = {}
+    get = line_ranks.get
+    for lit, ranks in PREFILTER_LITERALS.items():
+        i = find(lit)
+        while i >= 0:
+            line_start = rfind(b"\n", 0, i) + 1
+            seen = get(line_start)
+            if seen is None:
+                line_ranks[line_start] = ranks
+            elif seen is not ranks:
+                line_ranks[line_start] = seen | ranks
+            line_end = find(b"\n", i)
+            if line_end < 0:
+                break
+            i = find(lit, line_end + 1)
+    if UNCOVERED_PATTERN is not None:
+        _add_uncovered_candidates(buf, line_ranks)
+    return line_ranks
+
+
+def _ahocorasick_candidates(buf: bytes) -> Dict[int, Optional[AbstractSet[int]]]:
+    # Same result as _prefilter_candidates(), but all literals are found in
+    # one pass of the automaton instead of one find() sweep per literal.
+    text = buf.lower().decode("latin-1")
+    rfind = text.rfind
+    line_ranks: Dict[int, Optional[AbstractSet[int]]] = {}
+    get = line_ranks.get
+    for end, ranks in PREFILTER_AUTOMATON.iter(text):
+        line_start = rfind("\n", 0, end) + 1
+        seen = get(line_start)
+        if seen is None:
+            line_ranks[line_start] = ranks
+        elif seen is not ranks:
+            line_ranks[line_start] = seen | ranks
+    if UNCOVERED_PATTERN is not None:
+        _add_uncovered_candidates(buf, line_ranks)
+    return line_ranks
+
+
+def _regex_line_starts(buf: bytes, pattern: re.Pattern) -> Iterator[int]:
+    # Let the regex find candidate lines in C, resuming at the next line
+    # after each one (a \s can match across a newline, so each candidate is
+    # still confirmed on its own line).
+    search = pattern.search
+    find = buf.find
+    rfind = buf.rfind
+    pos = 0
+    while True:
+        m = search(buf, pos)
+        if m is None:
+            break
+        start = m.start()
+        yield max(rfind(b"\n", pos, start) + 1, pos)
+        pos = find(b"\n", start) + 1
+        if pos == 0:
+            break
+
+
+def _add_uncovered_candidates(buf: bytes, line_ranks: Dict[int, Optional[AbstractSet[int]]]):
+    # Patterns without prefilter literals can match lines the literals
+    # missed: add the lines their own alternation finds
+    get = line_ranks.get
+    for line_start in _regex_line_starts(buf, UNCOVERED_PATTERN):
+        seen = get(line_start)
+        line_ranks[line_start] = PREFILTER_UNCOVERED if seen is None else seen | PREFILTER_UNCOVERED
+
+
+def _regex_candidates(buf: bytes) -> Dict[int, Optional[AbstractSet[int]]]:
+    # Candidate lines for the master regex, each confirmed by match_line()
+    return dict.fromkeys(_regex_line_starts(buf, MASTER_PATTERN))
+
+
+# Pick the candidate-line finder once, from what is installed: Hyperscan;
+# else the literal prefilter under stdlib re (RE2's DFA scans the buffer
+# faster than the prefilter), via Aho-Corasick if available; else a
+# master-regex walk over the buffer.
+# Each returns {line_start: pattern ids to try on that line, or None}.
+if HS_DATABASE is not None:
+    _find_candidates = _hyperscan_candidates
+elif PREFILTER_LITERALS and isinstance(MASTER_PATTERN, re.Pattern):
+    _find_candidates = _ahocorasick_candidates if PREFILTER_AUTOMATON is not None else _prefilter_candidates
+else:
+    _find_candidates = _regex_candidates
+
+
+def scan_buffer(buf: bytes) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Scans a block of raw log bytes.
+    Returns parallel lists (categories, patterns, lines) for every matching
+    line, in order. Only matching lines are decoded (and stripped); category
+    and pattern entries are the shared strings from PATTERN_ORDER.
+    """
+    categories: List[str] = []
+    patterns: List[str] = []
+    lines: List[str] = []
+    if not buf:
+        return categories, patterns, lines
+
+    line_ranks = _find_candidates(buf)
+    find = buf.find
+    size = len(buf)
+    for start in sorted(line_ranks):
+        end = find(b"\n", start)
+        if end < 0:
+            end = size
+        line = buf[start:end]
+        ranks = line_ranks[start]
+        if ranks is None:
+            hit = match_line(line)
+        else:
+            hit = None
+            for rank in sorted(ranks):
+                cat, src, pat = PATTERN_ORDER[rank]
+                if pat.search(line):
+                    hit = cat, src
+                    break
+        if hit:
+            categories.append(hit[0])
+            patterns.append(hit[1])
+            lines.append(line.decode("utf-8", "replace").strip())
+    return categories, patterns, lines
+
 
 # ==============
 # DB DEFINITIONS
@@ -181,6 +554,11 @@ CREATE INDEX IF NOT EXISTS idx_events_cat ON events(category);
 def db() -> sqlite3.Connection:
     conn = sqlite3.connect(CONFIG["SQLITE_PATH"])
     conn.execute("PRAGMA foreign_keys=ON;")
+    # Per-connection settings: with WAL, NORMAL only fsyncs at checkpoints.
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-65536;")  # 64 MiB
+    conn.execute("PRAGMA wal_autocheckpoint=1000;")
     return conn
 
 
@@ -199,20 +577,38 @@ def upsert_file_id(conn: sqlite3.Connection, host: str, path: str) -> int:
     return int(row[0])
 
 
-def get_checkpoint(conn: sqlite3.Connection, file_id: int) -> Tuple[int, float]:
-    cur = conn.execute("SELECT offset, mtime FROM checkpoints WHERE file_id=?", (file_id,))
-    row = cur.fetchone()
-    if not row:
-        conn.execute("INSERT INTO checkpoints(file_id, offset, mtime) VALUES (?, 0, 0)", (file_id,))
-        return 0, 0.0
-    return int(row[0]), float(row[1])
+# In-process copy of files + checkpoints: (host, path) -> (file_id, offset, mtime).
+# Loaded once, then only changed checkpoints are written back each cycle.
+CHECKPOINTS: Optional[Dict[Tuple[str, str], Tuple[int, int, float]]] = None
+
+
+def load_checkpoints(conn: sqlite3.Connection):
+    global CHECKPOINTS
+    CHECKPOINTS = {}
+    cur = conn.execute(
+        "SELECT f.id, f.host, f.path, c.offset, c.mtime "
+        "FROM files f LEFT JOIN checkpoints c ON c.file_id = f.id"
+    )
+    for file_id, host, path, offset, mtime in cur:
+        CHECKPOINTS[(host, path)] = (int(file_id), int(offset or 0), float(mtime or 0.0))
+
+
+def get_checkpoint(conn: sqlite3.Connection, host: str, path: str) -> Tuple[int, int, float]:
+    """
+    Returns (file_id, offset, mtime) from the cache; a file seen for the first
+    time is inserted into `files` once and starts at offset 0.
+    """
+    cached = CHECKPOINTS.get((host, path))
+    if cached is None:
+        cached = CHECKPOINTS[(host, path)] = (upsert_file_id(conn, host, path), 0, 0.0)
+    return cached
 
 
-def update_checkpoint(conn: sqlite3.Connection, file_id: int, offset: int, mtime: float):
-    conn.execute(
+def save_checkpoints(conn: sqlite3.Connection, checkpoints: Iterable[Tuple[int, int, float]]):
+    conn.executemany(
         "INSERT INTO checkpoints(file_id, offset, mtime) VALUES (?, ?, ?) "
         "ON CONFLICT(file_id) DO UPDATE SET offset=excluded.offset, mtime=excluded.mtime",
-        (file_id, offset, mtime),
+        checkpoints,
     )
 
 
@@ -220,21 +616,59 @@ def update_checkpoint(conn: sqlite3.Connection, file_id: int, offset: int, mtime
 # CSV WRITER
 # =============
 
-def append_csv(rows: List[Tuple[str, str, str, str, str, str]], csv_path: str):
-    header = ["ts_utc", "host", "filepath", "category", "pattern", "line"]
-    file_exists = os.path.exists(csv_path)
-    with open(csv_path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(header)
-        writer.writerows(rows)
+# One append handle for the life of the process (opened on first use)
+CSV_FH = None
+CSV_WRITER = None
+
+
+def append_csv(rows: Iterable[Tuple[str, str, str, str, str, str]], csv_path: str):
+    global CSV_FH, CSV_WRITER
+    if CSV_FH is None:
+        CSV_FH = open(csv_path, "a", newline="", encoding="utf-8", buffering=1 << 20)
+        CSV_WRITER = csv.writer(CSV_FH)
+        if os.path.getsize(csv_path) == 0:
+            CSV_WRITER.writerow(["ts_utc", "host", "filepath", "category", "pattern", "line"])
+    CSV_WRITER.writerows(rows)
+
+
+def flush_csv():
+    if CSV_FH is not None:
+        CSV_FH.flush()
+
+
+def close_csv():
+    global CSV_FH, CSV_WRITER
+    if CSV_FH is not None:
+        CSV_FH.close()
+        CSV_FH = CSV_WRITER = None
 
 
 # =======================
 # ALERTING (EMAIL/SLACK)
 # =======================
 
+# Alert connections are opened on first use and kept for later alerts
+SMTP_CONN: Optional[smtplib.SMTP] = None
+SLACK_CONN: Optional[http.client.HTTPSConnection] = None
+
+
+def smtp_connection(email_cfg: dict) -> smtplib.SMTP:
+    global SMTP_CONN
+    if SMTP_CONN is None:
+        server = smtplib.SMTP(email_cfg["SMTP_HOST"], email_cfg["SMTP_PORT"])
+        try:
+            if email_cfg.get("USE_TLS", True):
+                server.starttls(context=ssl.create_default_context())
+            server.login(email_cfg["USERNAME"], email_cfg["PASSWORD"])
+        except Exception:
+            server.close()
+            raise
+        SMTP_CONN = server
+    return SMTP_CONN
+
+
 def send_email(subject: str, body: str):
+    global SMTP_CONN
     email_cfg = CONFIG["ALERTS"]["EMAIL"]
     if not email_cfg["ENABLED"]:
         return
@@ -245,38 +679,69 @@ def send_email(subject: str, body: str):
     msg["Subject"] = subject
     msg.set_content(body)
 
-    if email_cfg.get("USE_TLS", True):
-        context = ssl.create_default_context()
-        with smtplib.SMTP(email_cfg["SMTP_HOST"], email_cfg["SMTP_PORT"]) as server:
-            server.starttls(context=context)
-            server.login(email_cfg["USERNAME"], email_cfg["PASSWORD"])
-            server.send_message(msg)
-    else:
-        with smtplib.SMTP(email_cfg["SMTP_HOST"], email_cfg["SMTP_PORT"]) as server:
-            server.login(email_cfg["USERNAME"], email_cfg["PASSWORD"])
-            server.send_message(msg)
+    try:
+        reused = SMTP_CONN is not None
+        try:
+            smtp_connection(email_cfg).send_message(msg)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException) as e:
+            # The cached session idled out: the server dropped it, or (e.g.
+            # Postfix) answers "421 ... timeout exceeded". Log in again once.
+            # A fresh session failing is a real error, not a stale one.
+            if not reused or SMTP_CONN is None:
+                raise
+            if isinstance(e, smtplib.SMTPResponseException) and e.smtp_code != 421:
+                raise
+            SMTP_CONN.close()
+            SMTP_CONN = None
+            smtp_connection(email_cfg).send_message(msg)
+    except Exception:
+        if SMTP_CONN is not None:
+            SMTP_CONN.close()
+            SMTP_CONN = None
+        raise
 
 
 def send_slack(text: str):
+    global SLACK_CONN
     slack_cfg = CONFIG["ALERTS"]["SLACK"]
     if not slack_cfg["ENABLED"]:
         return
 
-    import urllib.request
-    import urllib.error
-
+    url = urllib.parse.urlsplit(slack_cfg["WEBHOOK_URL"])
+    path = url.path + (f"?{url.query}" if url.query else "")
     payload = json.dumps({"text": text}).encode("utf-8")
-    req = urllib.request.Request(
-        slack_cfg["WEBHOOK_URL"],
-        data=payload,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
+
+    # Reuse the kept-alive TLS connection; if the server has since closed it,
+    # the first attempt fails fast and we retry once on a fresh connection.
+    for attempt in range(2):
+        if SLACK_CONN is None:
+            SLACK_CONN = http.client.HTTPSConnection(url.hostname, url.port, timeout=10)
+        try:
+            SLACK_CONN.request("POST", path, body=payload, headers={"Content-Type": "application/json"})
+            resp = SLACK_CONN.getresponse()
             resp.read()
-    except urllib.error.URLError as e:
-        print(f"[WARN] Slack webhook failed: {e}")
+        except (http.client.HTTPException, OSError) as e:
+            SLACK_CONN.close()
+            SLACK_CONN = None
+            if attempt:
+                print(f"[WARN] Slack webhook failed: {e}")
+            continue
+        if resp.status >= 400:
+            print(f"[WARN] Slack webhook failed: HTTP {resp.status} {resp.reason}")
+        return
+
+
+def close_alert_connections():
+    global SMTP_CONN, SLACK_CONN
+    if SMTP_CONN is not None:
+        try:
+            SMTP_CONN.quit()
+        except Exception:
+            pass
+        SMTP_CONN = None
+    if SLACK_CONN is not None:
+        SLACK_CONN.close()
+        SLACK_CONN = None
 
 
 def alert_if_needed(counts: Dict[str, int], sample_events: Dict[str, List[Tuple[str, str]]]):
@@ -307,73 +772,348 @@ def alert_if_needed(counts: Dict[str, int], sample_events: Dict[str, List[Tuple[
 # SCANNING
 # ============
 
+def glob_matcher(globs: List[str]):
+    """
+    Returns a name -> bool predicate for FILENAME_GLOBS: a str.endswith()
+    check when every glob is a plain "*.ext", else one compiled regex of all
+    the globs (instead of re-parsing each glob per file).
+    """
+    suffixes = tuple(g[1:] for g in globs if g.startswith("*.") and not any(c in g[1:] for c in "*?["))
+    if len(suffixes) == len(globs):
+        return lambda name: name.endswith(suffixes)
+    return re.compile("|".join(fnmatch.translate(g) for g in globs)).match
+
+
 def expand_local_paths(paths: List[str], globs: List[str]) -> List[str]:
+    name_matches = glob_matcher(globs)
     final = []
     for p in paths:
         if os.path.isdir(p):
-            for root, _, files in os.walk(p):
-                for name in files:
-                    if any(Path(name).match(g) for g in globs):
-                        final.append(os.path.join(root, name))
-        else:
+            # Recursive walk on scandir: directory entries carry their type,
+            # so no extra stat per file
+            stack = [p]
+            while stack:
+                try:
+                    with os.scandir(stack.pop()) as it:
+                        for entry in it:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif name_matches(entry.name) and entry.is_file():
+                                final.append(entry.path)
+                except OSError:
+                    continue
+        elif os.path.exists(p):
+            # drop non-existent (quietly)
             final.append(p)
-    # drop non-existent (quietly)
-    return [fp for fp in final if os.path.exists(fp)]
+    return final
+
+
+# Local tails are read and scanned in pieces of this size (bounds memory)
+READ_CHUNK = 4 << 20
 
 
-def scan_local_file(conn: sqlite3.Connection, filepath: str) -> Tuple[int, List[Tuple[str, str, str, str, str, str]], Dict[str, int], Dict[str, List[Tuple[str, str]]]]:
+def _pread(fd: int, n: int, offset: int) -> bytes:
+    # os.pread is POSIX-only; elsewhere (Windows) seek and read instead
+    if hasattr(os, "pread"):
+        return os.pread(fd, n, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, n)
+
+
+def scan_local_file(filepath: str, old_offset: int, old_mtime: float) -> Optional[Tuple[int, Tuple[List[str], List[str], List[str]], Dict[str, int], Dict[str, List[Tuple[str, str]]], int, float]]:
     """
+    No DB access, so it can run in a worker process; the caller passes the
+    old checkpoint in and stores the new one.
     Returns:
       events_count,
-      csv_rows,
+      event_columns (categories, patterns, lines); the caller adds the
+        timestamp/host/path and inserts/exports them once per cycle,
       category_counts,
-      sample_events_for_alerting
+      sample_events_for_alerting,
+      new_offset,
+      mtime
+    or None if the file has disappeared.
     """
     host = "localhost"
-    file_id = upsert_file_id(conn, host, filepath)
-    old_offset, old_mtime = get_checkpoint(conn, file_id)
 
     try:
         st = os.stat(filepath)
         mtime = st.st_mtime
         size = st.st_size
     except FileNotFoundError:
-        return 0, [], {}, {}
+        return None
 
     # Handle truncation/rotation
     start_offset = old_offset if (mtime >= old_mtime and old_offset <= size) else 0
 
-    events = []
     counts = {"FAILED_LOGIN": 0, "CRASH": 0, "SUSPICIOUS": 0}
-    samples = {k: [] for k in counts.keys()}
-
-    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-        f.seek(start_offset)
-        for line in f:
-            matched = False
-            for category, patterns in COMPILED_PATTERNS.items():
-                for pat in patterns:
-                    if pat.search(line):
-                        matched = True
-                        ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S %Z")
-                        events.append((ts, host, filepath, category, pat.pattern, line.strip()))
-                        counts[category] += 1
-                        if len(samples[category]) < 5:
-                            samples[category].append((host, filepath))
-                        break
-                if matched:
+
+    # Read the tail in READ_CHUNK pieces with pread (one syscall each) and
+    # only consume whole lines: a partial last line of a chunk is carried
+    # into the next one, and at EOF it is left for the next cycle unless the
+    # file has been quiet for a full scan interval.
+    categories: List[str] = []
+    patterns: List[str] = []
+    lines: List[str] = []
+    end_offset = start_offset
+    if size > start_offset:
+        # O_BINARY (Windows only) keeps os.read from translating newlines
+        fd = os.open(filepath, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            offset = start_offset
+            carry = b""
+            while offset < size:
+                data = _pread(fd, min(READ_CHUNK, size - offset), offset)
+                if not data:
                     break
-        end_offset = f.tell()
+                offset += len(data)
+                buf = carry + data if carry else data
+                cut = buf.rfind(b"\n") + 1
+                c, p, l = scan_buffer(buf[:cut])
+                categories += c
+                patterns += p
+                lines += l
+                carry = buf[cut:]
+                end_offset += cut
+        finally:
+            os.close(fd)
+        if carry and time.time() - mtime >= CONFIG["SCAN_EVERY_SECONDS"]:
+            c, p, l = scan_buffer(carry)
+            categories += c
+            patterns += p
+            lines += l
+            end_offset += len(carry)
+
+    for category in categories:
+        counts[category] += 1
+    # Every event of a file has the same (host, path): one sample is enough
+    samples = {k: [(host, filepath)] if n else [] for k, n in counts.items()}
+
+    return len(lines), (categories, patterns, lines), counts, samples, end_offset, mtime
+
+
+def scan_local_batch(jobs: List[Tuple[str, int, float]]) -> List[Tuple[bool, object]]:
+    """
+    Runs scan_local_file() for several (filepath, old_offset, old_mtime) jobs
+    in one worker task, so many small files cost one pool round trip instead
+    of one each. Returns (ok, result or exception) per job, in job order.
+    """
+    results = []
+    for fp, offset, mtime in jobs:
+        try:
+            results.append((True, scan_local_file(fp, offset, mtime)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+def _resolve_batch(futures: List[Future], batch: Future):
+    # Fan a scan_local_batch() result out to the per-file futures
+    try:
+        results = batch.result()
+    except BaseException as e:
+        for fut in futures:
+            fut.set_exception(e)
+        return
+    for fut, (ok, value) in zip(futures, results):
+        if ok:
+            fut.set_result(value)
+        else:
+            fut.set_exception(value)
+
+
+LOCAL_POOL: Optional[ProcessPoolExecutor] = None
+LOCAL_POOL_WORKERS = 0
 
-    if events:
-        conn.executemany(
-            "INSERT INTO events(ts_utc, host, filepath, category, pattern, line) VALUES (?, ?, ?, ?, ?, ?)",
-            events,
-        )
-        append_csv(events, CONFIG["CSV_PATH"])
 
-    update_checkpoint(conn, file_id, end_offset, mtime)
-    return len(events), events, counts, samples
+def _init_local_worker():
+    # Ctrl-C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def submit_local_scans(jobs: List[Tuple[str, int, float]]) -> List[Future]:
+    """
+    Starts scan_local_file() for each (filepath, old_offset, old_mtime) job.
+    Several files fan out over a process pool (kept across cycles, and only
+    as large as the file count needs), grouped into a few batches per worker
+    so many small files don't cost one task round trip each; a single file
+    is scanned inline.
+    Returns one future per job, in job order.
+    """
+    global LOCAL_POOL, LOCAL_POOL_WORKERS
+    if len(jobs) > 1:
+        workers = min(len(jobs), CONFIG["LOCAL_SCAN_WORKERS"] or os.cpu_count() or 1)
+        if LOCAL_POOL is None or LOCAL_POOL_WORKERS < workers:
+            close_local_pool()
+            # This process has threads (watchdog, SFTP reads), so workers are
+            # not fork()ed from it: with forkserver they start from a clean
+            # process and compile the patterns once on import.
+            ctx = (
+                multiprocessing.get_context("forkserver")
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else None
+            )
+            LOCAL_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_local_worker)
+            LOCAL_POOL_WORKERS = workers
+        workers = LOCAL_POOL_WORKERS
+        # Up to 4 batches per worker keeps the load balanced when file sizes differ
+        batch_size = -(-len(jobs) // (workers * 4))
+        futures = [Future() for _ in jobs]
+        for i in range(0, len(jobs), batch_size):
+            batch = LOCAL_POOL.submit(scan_local_batch, jobs[i:i + batch_size])
+            batch.add_done_callback(partial(_resolve_batch, futures[i:i + batch_size]))
+        return futures
+
+    futures = []
+    for fp, offset, mtime in jobs:
+        fut: Future = Future()
+        try:
+            fut.set_result(scan_local_file(fp, offset, mtime))
+        except Exception as e:
+            fut.set_exception(e)
+        futures.append(fut)
+    return futures
+
+
+def close_local_pool():
+    global LOCAL_POOL, LOCAL_POOL_WORKERS
+    if LOCAL_POOL is not None:
+        LOCAL_POOL.shutdown(wait=False, cancel_futures=True)
+        LOCAL_POOL = None
+        LOCAL_POOL_WORKERS = 0
+
+
+class LocalFileWatcher(FileSystemEventHandler):
+    """
+    Remembers which local files the OS reported as written, created or moved
+    into place, so scan cycles can skip the unchanged ones.
+    Without watchdog (or if watching fails) every cycle scans every file.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._dirty: Set[str] = set()
+        self._observer = None
+        self._last_full_scan = 0.0
+        self._paths: List[str] = []
+        self._watched: Dict[str, bool] = {}
+        self._failed: Set[str] = set()
+        self._real: Dict[str, str] = {}
+
+    def start(self, paths: List[str]) -> bool:
+        if Observer is None or not CONFIG["WATCH_LOCAL_FILES"]:
+            return False
+        observer = Observer()
+        try:
+            observer.start()
+        except Exception as e:
+            print(f"[WARN] File watching unavailable, scanning every file each cycle: {e}")
+            return False
+        self._observer = observer
+        self._paths = list(paths)
+        self._add_watches()
+        return True
+
+    def _add_watches(self) -> bool:
+        """
+        Watches the configured directories, and the parent dir of plain files
+        so rotation (create/move) is seen as well as writes. Symlinks are
+        resolved so events carry the same path select() compares against.
+        Called every cycle to pick up directories created after startup.
+        """
+        added = False
+        for p in self._paths:
+            real = os.path.realpath(p)
+            if os.path.isdir(real):
+                path, recursive = real, True
+            else:
+                path, recursive = os.path.dirname(real), False
+                if not os.path.isdir(path):
+                    continue
+            if self._watched.get(path, False) or (path in self._watched and not recursive):
+                continue
+            try:
+                self._observer.schedule(self, path, recursive=recursive)
+            except Exception as e:
+                # Files under it stay un-watched and are checked every cycle
+                if path not in self._failed:
+                    self._failed.add(path)
+                    print(f"[WARN] Cannot watch {path}, checking its files every cycle: {e}")
+                continue
+            self._watched[path] = recursive
+            added = True
+        return added
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+
+    def _add(self, path: str):
+        with self._lock:
+            self._dirty.add(os.path.realpath(path))
+
+    # Only content changes matter; open/close events are our own reads
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._add(event.src_path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._add(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._add(event.dest_path)
+
+    def mark(self, path: str):
+        """Scan this file again next cycle (e.g. a partial line was held back)."""
+        if self._observer is not None:
+            self._add(path)
+
+    def rescan_all(self):
+        self._last_full_scan = 0.0
+
+    def _realpath(self, fp: str) -> str:
+        real = self._real.get(fp)
+        if real is None:
+            real = self._real[fp] = os.path.realpath(fp)
+        return real
+
+    def _covered(self, real: str) -> bool:
+        if os.path.dirname(real) in self._watched:
+            return True
+        return any(recursive and real.startswith(path + os.sep)
+                   for path, recursive in self._watched.items())
+
+    def select(self, files: List[str]) -> List[str]:
+        """
+        Returns the files this cycle has to scan: all of them when not
+        watching, when a full rescan is due or a new watch was just added,
+        otherwise the changed ones plus any file outside every watch.
+        """
+        if self._observer is None or not self._observer.is_alive():
+            return files
+        added = self._add_watches()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        now = time.time()
+        if added or now - self._last_full_scan >= CONFIG["WATCH_FULL_RESCAN_SECONDS"]:
+            # Symlinks may have been repointed since the last full pass
+            self._real.clear()
+            self._last_full_scan = now
+            return files
+        selected = []
+        for fp in files:
+            real = self._realpath(fp)
+            if real in dirty or not self._covered(real):
+                selected.append(fp)
+        return selected
+
+
+LOCAL_WATCHER = LocalFileWatcher()
 
 
 # ---------------
@@ -383,11 +1123,14 @@ def scan_local_file(conn: sqlite3.Connection, filepath: str) -> Tuple[int, List[
 class SSHClientCache:
     def __init__(self):
         self._clients: Dict[str, paramiko.SSHClient] = {}
+        # Per scan thread: host_label -> (ssh_client, sftp_channel)
+        self._local = threading.local()
 
-    def get_sftp(self, cfg: dict) -> Tuple[str, paramiko.SFTPClient]:
+    def get_client(self, cfg: dict) -> Tuple[str, paramiko.SSHClient]:
         """
-        Returns (host_label, sftp_client).
+        Returns (host_label, ssh_client); the connection is reused across cycles.
         host_label is what we use in DB & alerts (host:port).
+        SFTP channels on it come from get_sftp(), one per scan thread.
         """
         host = cfg["host"]
         port = int(cfg.get("port", 22))
@@ -406,7 +1149,32 @@ class SSHClientCache:
                 look_for_keys=True,
             )
             self._clients[key] = client
-        return f"{host}:{port}", self._clients[key].open_sftp()
+        return f"{host}:{port}", self._clients[key]
+
+    def get_sftp(self, host_label: str, client: paramiko.SSHClient) -> paramiko.SFTPClient:
+        """
+        Returns this thread's SFTP channel to the host, opened on first use
+        and reused across cycles (an SFTP client isn't safe to share between
+        threads). A channel from an older connection is replaced.
+        """
+        channels = getattr(self._local, "channels", None)
+        if channels is None:
+            channels = self._local.channels = {}
+        entry = channels.get(host_label)
+        if entry is None or entry[0] is not client:
+            if entry is not None:
+                self.drop_sftp(host_label)
+            entry = channels[host_label] = (client, client.open_sftp())
+        return entry[1]
+
+    def drop_sftp(self, host_label: str):
+        """Closes this thread's channel to the host (e.g. after an error)."""
+        entry = getattr(self._local, "channels", {}).pop(host_label, None)
+        if entry is not None:
+            try:
+                entry[1].close()
+            except Exception:
+                pass
 
     def close_all(self):
         for client in self._clients.values():
@@ -419,103 +1187,195 @@ class SSHClientCache:
 
 SSH_CACHE = SSHClientCache()
 
+# Remote reads run on these threads; they live across cycles so each keeps
+# its SFTP channels (see SSHClientCache.get_sftp)
+REMOTE_POOL: Optional[ThreadPoolExecutor] = None
 
-def scan_remote_file(conn: sqlite3.Connection, host_label: str, sftp: paramiko.SFTPClient, remote_path: str) -> Tuple[int, List[Tuple[str, str, str, str, str, str]], Dict[str, int], Dict[str, List[Tuple[str, str]]]]:
-    file_id = upsert_file_id(conn, host_label, remote_path)
-    old_offset, old_mtime = get_checkpoint(conn, file_id)
 
+def close_remote_pool():
+    global REMOTE_POOL
+    if REMOTE_POOL is not None:
+        REMOTE_POOL.shutdown(wait=False, cancel_futures=True)
+        REMOTE_POOL = None
+
+
+def scan_remote_file(host_label: str, client: paramiko.SSHClient, remote_path: str, old_offset: int, old_mtime: float) -> Optional[Tuple[int, Tuple[List[str], List[str], List[str]], Dict[str, int], Dict[str, List[Tuple[str, str]]], int, float]]:
+    """
+    Thread-safe remote counterpart of scan_local_file(): reads through the
+    calling thread's own SFTP channel on the shared SSH transport and does
+    no DB access.
+    Returns the same tuple as scan_local_file(), or None if the file is
+    missing or unreadable.
+    """
+    counts = {"FAILED_LOGIN": 0, "CRASH": 0, "SUSPICIOUS": 0}
+
+    sftp = SSH_CACHE.get_sftp(host_label, client)
     try:
         st = sftp.stat(remote_path)
         mtime = st.st_mtime
         size = st.st_size
     except IOError:
-        return 0, [], {}, {}
+        return None
+    except Exception:
+        # The channel itself failed; open a fresh one next time
+        SSH_CACHE.drop_sftp(host_label)
+        raise
 
     start_offset = old_offset if (mtime >= old_mtime and old_offset <= size) else 0
 
-    events = []
-    counts = {"FAILED_LOGIN": 0, "CRASH": 0, "SUSPICIOUS": 0}
-    samples = {k: [] for k in counts.keys()}
-
-    # SFTP file-like object supports seek/tell/read
-    try:
-        f = sftp.open(remote_path, "r")
-        f.set_pipelined(True)
-        f.seek(start_offset)
-        for raw in f:
-            try:
-                line = raw.decode("utf-8", "ignore") if isinstance(raw, bytes) else raw
-            except Exception:
-                line = str(raw)
-            matched = False
-            for category, patterns in COMPILED_PATTERNS.items():
-                for pat in patterns:
-                    if pat.search(line):
-                        matched = True
-                        ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S %Z")
-                        events.append((ts, host_label, remote_path, category, pat.pattern, line.strip()))
-                        counts[category] += 1
-                        if len(samples[category]) < 5:
-                            samples[category].append((host_label, remote_path))
+    # Same whole-line READ_CHUNK loop as scan_local_file(). Each chunk is one
+    # readv(), which pipelines its SFTP read requests; a prefetch() of the
+    # whole tail would buffer all of it in memory.
+    categories: List[str] = []
+    patterns: List[str] = []
+    lines: List[str] = []
+    end_offset = start_offset
+    if size > start_offset:
+        carry = b""
+        try:
+            with sftp.open(remote_path, "rb") as f:
+                offset = start_offset
+                while offset < size:
+                    data = next(f.readv([(offset, min(READ_CHUNK, size - offset))]), b"")
+                    if not data:
                         break
-                if matched:
-                    break
-        end_offset = f.tell()
-        f.close()
-    except Exception as e:
-        print(f"[WARN] Remote read failed {host_label}:{remote_path}: {e}")
-        return 0, [], {}, {}
-
-    if events:
-        conn.executemany(
-            "INSERT INTO events(ts_utc, host, filepath, category, pattern, line) VALUES (?, ?, ?, ?, ?, ?)",
-            events,
-        )
-        append_csv(events, CONFIG["CSV_PATH"])
-
-    update_checkpoint(conn, file_id, end_offset, mtime)
-    return len(events), events, counts, samples
+                    offset += len(data)
+                    buf = carry + data if carry else data
+                    cut = buf.rfind(b"\n") + 1
+                    c, p, l = scan_buffer(buf[:cut])
+                    categories += c
+                    patterns += p
+                    lines += l
+                    carry = buf[cut:]
+                    end_offset += cut
+        except Exception as e:
+            print(f"[WARN] Remote read failed {host_label}:{remote_path}: {e}")
+            SSH_CACHE.drop_sftp(host_label)
+            return None
+        # The remote clock may differ from ours, so "quiet" means the mtime
+        # hasn't moved since the previous cycle rather than an age check
+        if carry and mtime == old_mtime:
+            c, p, l = scan_buffer(carry)
+            categories += c
+            patterns += p
+            lines += l
+            end_offset += len(carry)
+
+    for category in categories:
+        counts[category] += 1
+    samples = {k: [(host_label, remote_path)] if n else [] for k, n in counts.items()}
+
+    return len(lines), (categories, patterns, lines), counts, samples, end_offset, mtime
 
 
 # ==========
 # SCHEDULER
 # ==========
 
+def event_rows(ts: str, batches: List[Tuple[str, str, Tuple[List[str], List[str], List[str]]]]) -> Iterator[Tuple[str, str, str, str, str, str]]:
+    """
+    Yields (ts, host, filepath, category, pattern, line) rows from the
+    per-file event columns, without materialising the whole row list.
+    """
+    for host, filepath, (categories, patterns, lines) in batches:
+        yield from zip(repeat(ts), repeat(host), repeat(filepath), categories, patterns, lines)
+
+
 def scan_once():
+    global CHECKPOINTS, REMOTE_POOL
     print(f"[{datetime.now().strftime('%H:%M:%S')}] scanning...")
     total_found = 0
     aggregate_counts = {"FAILED_LOGIN": 0, "CRASH": 0, "SUSPICIOUS": 0}
     sample_events: Dict[str, List[Tuple[str, str]]] = {k: [] for k in aggregate_counts.keys()}
+    # (host, path, event_columns) per scanned file; rows are built at insert
+    event_batches: List[Tuple[str, str, Tuple[List[str], List[str], List[str]]]] = []
+    # (host, path) -> (file_id, offset, mtime) reached by this cycle's scans
+    new_checkpoints: Dict[Tuple[str, str], Tuple[int, int, float]] = {}
+    # One timestamp per cycle: events are only as precise as the scan interval
+    cycle_ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S %Z")
+
+    conn = None
+    try:
+        conn = db()
+        with conn:
+            # One write transaction per cycle (committed when the block exits)
+            conn.execute("BEGIN IMMEDIATE")
+            if CHECKPOINTS is None:
+                load_checkpoints(conn)
+
+            # LOCAL
+            if CONFIG["MODE"] in ("local", "mixed"):
+                local_files = LOCAL_WATCHER.select(
+                    expand_local_paths(CONFIG["LOCAL_PATHS"], CONFIG["FILENAME_GLOBS"])
+                )
+                file_ids = []
+                jobs = []
+                for fp in local_files:
+                    file_id, old_offset, old_mtime = get_checkpoint(conn, "localhost", fp)
+                    file_ids.append(file_id)
+                    jobs.append((fp, old_offset, old_mtime))
+
+                # Scan in parallel; all DB writes stay here in the parent
+                futures = submit_local_scans(jobs)
+                for fp, file_id, fut in zip(local_files, file_ids, futures):
+                    try:
+                        result = fut.result()
+                        if result is None:
+                            continue
+                        found, events, counts, samples, end_offset, mtime = result
+                        new_checkpoints[("localhost", fp)] = (file_id, end_offset, mtime)
+                        if time.time() - mtime < CONFIG["SCAN_EVERY_SECONDS"]:
+                            # A partial last line may have been held back
+                            LOCAL_WATCHER.mark(fp)
+                        total_found += found
+                        if found:
+                            event_batches.append(("localhost", fp, events))
+                        for k in aggregate_counts.keys():
+                            aggregate_counts[k] += counts.get(k, 0)
+                            # only keep a handful to show in alerts
+                            for s in samples.get(k, []):
+                                if len(sample_events[k]) < 5:
+                                    sample_events[k].append(s)
+                    except BrokenProcessPool as e:
+                        # A worker process died; start a fresh pool next time
+                        print(f"[WARN] Local scan worker died for {fp}: {e}")
+                        close_local_pool()
+                        LOCAL_WATCHER.mark(fp)
+                    except Exception as e:
+                        print(f"[WARN] Local scan failed for {fp}: {e}")
+                        LOCAL_WATCHER.mark(fp)
 
-    with db() as conn:
-        # LOCAL
-        if CONFIG["MODE"] in ("local", "mixed"):
-            local_files = expand_local_paths(CONFIG["LOCAL_PATHS"], CONFIG["FILENAME_GLOBS"])
-            for fp in local_files:
-                try:
-                    found, _, counts, samples = scan_local_file(conn, fp)
-                    total_found += found
-                    for k in aggregate_counts.keys():
-                        aggregate_counts[k] += counts.get(k, 0)
-                        # only keep a handful to show in alerts
-                        for s in samples.get(k, []):
-                            if len(sample_events[k]) < 5:
-                                sample_events[k].append(s)
-                except Exception as e:
-                    print(f"[WARN] Local scan failed for {fp}: {e}")
-
-        # REMOTE
-        if CONFIG["MODE"] in ("remote", "mixed"):
-            for rh in CONFIG["REMOTE_HOSTS"]:
-                try:
-                    host_label, sftp = SSH_CACHE.get_sftp(rh)
-                except Exception as e:
-                    print(f"[WARN] SSH connect failed {rh.get('host')}: {e}")
-                    continue
-                for rpath in rh.get("paths", []):
+            # REMOTE
+            if CONFIG["MODE"] in ("remote", "mixed"):
+                remote_jobs = []
+                for rh in CONFIG["REMOTE_HOSTS"]:
+                    try:
+                        host_label, client = SSH_CACHE.get_client(rh)
+                    except Exception as e:
+                        print(f"[WARN] SSH connect failed {rh.get('host')}: {e}")
+                        continue
+                    for rpath in rh.get("paths", []):
+                        file_id, old_offset, old_mtime = get_checkpoint(conn, host_label, rpath)
+                        remote_jobs.append((file_id, host_label, client, rpath, old_offset, old_mtime))
+
+                # Latency-bound: overlap reads across hosts and files (paramiko
+                # releases the GIL on socket I/O). DB writes stay on this thread.
+                if REMOTE_POOL is None:
+                    REMOTE_POOL = ThreadPoolExecutor(max_workers=CONFIG["REMOTE_SCAN_WORKERS"] or None)
+                futures = [
+                    REMOTE_POOL.submit(scan_remote_file, host_label, client, rpath, old_offset, old_mtime)
+                    for _, host_label, client, rpath, old_offset, old_mtime in remote_jobs
+                ]
+                for (file_id, host_label, _, rpath, _, _), fut in zip(remote_jobs, futures):
                     try:
-                        found, _, counts, samples = scan_remote_file(conn, host_label, sftp, rpath)
+                        result = fut.result()
+                        if result is None:
+                            continue
+                        found, events, counts, samples, end_offset, mtime = result
+                        new_checkpoints[(host_label, rpath)] = (file_id, end_offset, mtime)
                         total_found += found
+                        if found:
+                            event_batches.append((host_label, rpath, events))
                         for k in aggregate_counts.keys():
                             aggregate_counts[k] += counts.get(k, 0)
                             for s in samples.get(k, []):
@@ -524,8 +1384,51 @@ def scan_once():
                     except Exception as e:
                         print(f"[WARN] Remote scan failed {host_label}:{rpath}: {e}")
 
+            if event_batches:
+                conn.executemany(
+                    "INSERT INTO events(ts_utc, host, filepath, category, pattern, line) VALUES (?, ?, ?, ?, ?, ?)",
+                    event_rows(cycle_ts, event_batches),
+                )
+
+            # Write back only the checkpoints that actually moved
+            changed = {k: v for k, v in new_checkpoints.items() if CHECKPOINTS.get(k) != v}
+            if changed:
+                save_checkpoints(conn, changed.values())
+    except Exception as e:
+        # Nothing from this cycle was stored; the same tails are read again
+        # next cycle, so reload the checkpoint cache and look at every file
+        print(f"[WARN] Scan cycle failed, will retry next cycle: {e}")
+        if conn is not None:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+        CHECKPOINTS = None
+        LOCAL_WATCHER.rescan_all()
+        return
+    finally:
+        if conn is not None:
+            conn.close()
+    CHECKPOINTS.update(changed)
+
+    # CSV only after the commit, so a failed cycle can't export rows twice.
+    # The events are already in SQLite, so an export error must not stop us.
+    if event_batches:
+        try:
+            append_csv(event_rows(cycle_ts, event_batches), CONFIG["CSV_PATH"])
+            flush_csv()
+        except Exception as e:
+            print(f"[WARN] CSV export failed: {e}")
+            try:
+                close_csv()
+            except Exception:
+                pass
+
     print(f"[scan] new events this cycle: {total_found}  | counts {aggregate_counts}")
-    alert_if_needed(aggregate_counts, sample_events)
+    try:
+        alert_if_needed(aggregate_counts, sample_events)
+    except Exception as e:
+        print(f"[WARN] Alert failed: {e}")
 
 
 def daily_db_maintenance():
@@ -543,12 +1446,15 @@ def main():
     print(" Automated Log Analyzer & Alerting ")
     print("=" * 60)
     print(f"Mode: {CONFIG['MODE']}")
+    watching = False
     if CONFIG["MODE"] in ("local", "mixed"):
         print(f"Local paths: {CONFIG['LOCAL_PATHS']}")
+        watching = LOCAL_WATCHER.start(CONFIG["LOCAL_PATHS"])
     if CONFIG["MODE"] in ("remote", "mixed"):
         rh_hosts = [f"{h.get('host')}:{h.get('port',22)}" for h in CONFIG["REMOTE_HOSTS"]]
         print(f"Remote hosts: {rh_hosts}")
-    print(f"Scan interval: {CONFIG['SCAN_EVERY_SECONDS']}s")
+    print(f"Scan interval: {CONFIG['SCAN_EVERY_SECONDS']}s"
+          + (" (local: changed files only)" if watching else ""))
     print(f"Output: SQLite={CONFIG['SQLITE_PATH']}  CSV={CONFIG['CSV_PATH']}")
     print("Alerts:",
           f"Email={'ON' if CONFIG['ALERTS']['EMAIL']['ENABLED'] else 'OFF'},",
@@ -569,6 +1475,11 @@ def main():
     except KeyboardInterrupt:
         print("\n[exit] shutting down...")
     finally:
+        LOCAL_WATCHER.stop()
+        close_alert_connections()
+        close_csv()
+        close_local_pool()
+        close_remote_pool()
         SSH_CACHE.close_all()
 
 
@@ -0,0 +1,63 @@
+import os
+import unittest
+
+import log_analyzer as la
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Mixed case, a line with two patterns, an unterminated last line
+MIXED = (
+    b"FAILED PASSWORD for root from 10.0.0.1 port 22\n"
+    b"kErNeL PaNiC - not syncing\n"
+    b"GET /a?q=1 UNION all SeLeCt pw HTTP/1.1\n"
+    b"nothing to see here\n"
+    b"\n"
+    b"critical: disk Error on sda, GET /../../x 403\n"
+    b"Invalid User bob from 10.0.0.2\n"
+    b"Traceback (Most Recent Call Last):"
+)
+
+
+def reference_scan(buf):
+    # Every line through match_line(), no candidate finder involved
+    categories, patterns, lines = [], [], []
+    for line in buf.split(b"\n"):
+        hit = la.match_line(line)
+        if hit:
+            categories.append(hit[0])
+            patterns.append(hit[1])
+            lines.append(line.decode("utf-8", "replace").strip())
+    return categories, patterns, lines
+
+
+class CandidateFinderTest(unittest.TestCase):
+    """
+    Every candidate finder must give scan_buffer() the same result, whichever
+    one the installed engines select at import.
+    """
+
+    def setUp(self):
+        self.finders = [la._regex_candidates, la._prefilter_candidates]
+        if la.PREFILTER_AUTOMATON is not None:
+            self.finders.append(la._ahocorasick_candidates)
+        if la.HS_DATABASE is not None:
+            self.finders.append(la._hyperscan_candidates)
+        with open(os.path.join(HERE, "test.log"), "rb") as f:
+            self.samples = {"test.log": f.read(), "mixed": MIXED}
+        self.default = la._find_candidates
+
+    def tearDown(self):
+        la._find_candidates = self.default
+
+    def test_finders_agree(self):
+        for name, buf in self.samples.items():
+            expected = reference_scan(buf)
+            self.assertTrue(expected[0])
+            for finder in self.finders:
+                with self.subTest(sample=name, finder=finder.__name__):
+                    la._find_candidates = finder
+                    self.assertEqual(la.scan_buffer(buf), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()